@@ -5,27 +5,76 @@ import os
 import sys
 import time
 import logging
+import logging.handlers
 import signal
+import atexit
 import re
+import html
 import shutil
 import subprocess
+import threading
+import queue
+import json
+import concurrent.futures
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import configparser
 import random
-import http.cookiejar
 
 # Global variables
-STOP_EVENT = False
-PROCESS = None
+STOP_EVENT = threading.Event()
+ACTIVE_PROCESSES = set()
+PROCESS_LOCK = threading.Lock()
+CONSOLE_LOCK = threading.Lock()
 SCRIPT_DIR = Path(__file__).parent
 INITIAL_AUTH_LOGGED = {"tc_ss": False, "api": False}
+PAGE_CACHE = {}
+COOKIE_CACHE = {}
+METADATA_CACHE = {}
+METADATA_LOCK = threading.Lock()
+METADATA_CACHE_FILE = SCRIPT_DIR / ".meta_cache.json"
+METADATA_CACHE_TTL = 3600
+FFMPEG_PATH = "ffmpeg"
+YTDLP_PATH = "yt-dlp"
+FFPROBE_PATH = "ffprobe"
+THUMBNAIL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnail")
+RECORDING_SLOTS = None
+STREAMER_RE = re.compile(r"^[a-zA-Z0-9_:]+$")
+INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+STREAM_ID_RE = re.compile(r'movie_id=(\d+)|/movie/(\d+)|movieid/(\d+)|/streams/(\d+)')
+MOVIE_ID_RE = re.compile(rb"movie_id=(\d+)")
+OG_META_RE = re.compile(rb'<meta[^>]+property=["\']og:(title|image)["\'][^>]+content="([^"]*)"', re.I)
+LINE_SPLIT_RE = re.compile(rb"\r\n|\r|\n")
+# domain, name and value of a cookies.txt line; browser exports mark HttpOnly cookies with #HttpOnly_
+COOKIE_LINE_RE = re.compile(r"^[ \t]*(?:#HttpOnly_)?([^#\s][^\t\r\n]*)\t(?:[^\t\r\n]*\t){4}([^\t\r\n]*)\t([^\t\r\n]*)", re.M)
+HEAD_READ_LIMIT = 64 * 1024
+MIN_FREE_SPACE_GB = 5
+STDERR_TAIL_LINES = 50
+TS_PACKET_SIZE = 188
+TS_SCAN_BYTES = TS_PACKET_SIZE * 1024
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+YTDLP_HEADER_ARGS = [
+    "--user-agent", USER_AGENT,
+    "--add-header", "Referer:https://twitcasting.tv/",
+    "--add-header", "Origin:https://twitcasting.tv/"
+]
+
+# Shared HTTP session so polls reuse the keep-alive connection to twitcasting.tv;
+# parse_cookies() keeps its cookie jar in sync with cookies.txt
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Referer": "https://twitcasting.tv/",
+    "Origin": "https://twitcasting.tv/"
+})
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), respect_retry_after_header=False)))
 
 def sanitize_filename(name):
-    invalid_chars = r'[<>:"/\\|?*]'
-    return re.sub(invalid_chars, "_", name)
+    return INVALID_CHARS_RE.sub("_", name)
 
 def setup_logging(debug, streamer=None):
     logs_folder = SCRIPT_DIR / "logs"
@@ -38,30 +87,47 @@ def setup_logging(debug, streamer=None):
         def emit(self, record):
             try:
                 msg = self.format(record)
-                sys.stdout.write("\r\033[K")
-                sys.stdout.write(msg)
-                sys.stdout.flush()
-                if "Stream offline" not in msg:
-                    sys.stdout.write("\n")
+                with CONSOLE_LOCK:
+                    sys.stdout.write("\r\033[K")
+                    sys.stdout.write(msg)
+                    sys.stdout.flush()
+                    if "Stream offline" not in msg:
+                        sys.stdout.write("\n")
             except Exception as e:
                 self.handleError(record)
     
+    formatter = logging.Formatter("%(asctime)s,%(msecs)03d [%(levelname)s] [%(threadName)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    handlers = [
+        logging.FileHandler(log_file, encoding="utf-8"),
+        StreamOfflineHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    # file and console writes happen on the listener thread, off the recording loop
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
     logging.basicConfig(
         level=logging.DEBUG if debug else logging.INFO,
-        format="%(asctime)s,%(msecs)03d [%(levelname)s] %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            StreamOfflineHandler()
-        ]
+        format="%(message)s",
+        handlers=[logging.handlers.QueueHandler(log_queue)],
+        force=True
     )
+    if not debug:
+        # SESSION retries failed polls itself; urllib3 warns about every attempt
+        logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
     logging.info(f"Logging initialized to {log_file}")
 
 def check_dependencies():
-    required = ["ffmpeg", "yt-dlp"]
+    global FFMPEG_PATH, YTDLP_PATH, FFPROBE_PATH
+    FFMPEG_PATH = shutil.which("ffmpeg")
+    YTDLP_PATH = shutil.which("yt-dlp")
+    FFPROBE_PATH = shutil.which("ffprobe") or "ffprobe"
     missing = []
-    for tool in required:
-        if not shutil.which(tool):
+    for tool, path in [("ffmpeg", FFMPEG_PATH), ("yt-dlp", YTDLP_PATH)]:
+        if not path:
             missing.append(tool)
     if missing:
         logging.error(f"Missing dependencies: {', '.join(missing)}")
@@ -76,7 +142,8 @@ def load_config(config_file):
         "twitcasting_username": os.getenv("TWITCASTING_USERNAME", ""),
         "twitcasting_password": os.getenv("TWITCASTING_PASSWORD", ""),
         "private_stream_password": os.getenv("PRIVATE_STREAM_PASSWORD", ""),
-        "hls_url": os.getenv("HLS_URL", "")
+        "hls_url": os.getenv("HLS_URL", ""),
+        "max_parallel_recordings": os.getenv("MAX_PARALLEL_RECORDINGS", "0")
     }
     if "recorder" in config:
         defaults.update(config["recorder"])
@@ -90,27 +157,39 @@ def parse_args():
     parser.add_argument("--debug", action="store_true")
     parser.add_argument("--fast-exit", action="store_true")
     parser.add_argument("--hls-url", help="Direct HLS URL to record")
+    parser.add_argument("--all", action="store_true", help="Monitor every streamer in the streamers file")
+    parser.add_argument("--max-parallel-recordings", type=int, help="Maximum simultaneous recordings (0 = unlimited)")
     return parser.parse_args()
 
 def validate_streamer(streamer):
-    if not re.match(r"^[a-zA-Z0-9_:]+$", streamer):
+    if not STREAMER_RE.match(streamer):
         logging.error(f"Invalid streamer username: {streamer}")
         sys.exit(1)
     return streamer
 
-def select_streamer(args, streamers_file):
-    if args.streamer:
-        return validate_streamer(args.streamer)
+def load_streamers(streamers_file):
     if not streamers_file.exists():
         logging.error(f"Streamers file not found: {streamers_file}")
         sys.exit(1)
     with streamers_file.open("r", encoding="utf-8") as f:
-        streamers = [line.strip() for line in f if line.strip()]
+        lines = [line.strip() for line in f if line.strip()]
+    streamers = []
+    for streamer in lines:
+        if STREAMER_RE.match(streamer):
+            streamers.append(streamer)
+        else:
+            logging.warning(f"Skipping invalid streamer username in {streamers_file.name}: {streamer}")
     if not streamers:
         logging.error("No streamers found in streamers.txt")
         sys.exit(1)
+    return streamers
+
+def select_streamer(args, streamers_file):
+    if args.streamer:
+        return validate_streamer(args.streamer)
+    streamers = load_streamers(streamers_file)
     if len(streamers) == 1:
-        return validate_streamer(streamers[0])
+        return streamers[0]
     print("Select a streamer:")
     for i, streamer in enumerate(streamers, 1):
         print(f"{i}. {streamer}")
@@ -118,88 +197,65 @@ def select_streamer(args, streamers_file):
         try:
             choice = int(input("Enter number: ")) - 1
             if 0 <= choice < len(streamers):
-                return validate_streamer(streamers[choice])
+                return streamers[choice]
             print("Invalid choice.")
         except ValueError:
             print("Enter a valid number.")
 
-def check_disk_space(save_folder, min_space_gb=5):
-    total, used, free = shutil.disk_usage(save_folder)
-    free_gb = free / (1024 ** 3)
-    if free_gb < min_space_gb:
-        logging.error(f"Insufficient disk space: {free_gb:.2f} GB available, {min_space_gb} GB required")
+def get_free_space(path):
+    if hasattr(os, "statvfs"):
+        st = os.statvfs(path)
+        return st.f_bavail * st.f_frsize
+    return shutil.disk_usage(path).free
+
+def check_disk_space(save_folder, min_space_gb=MIN_FREE_SPACE_GB):
+    free = get_free_space(save_folder)
+    if free < min_space_gb * (1 << 30):
+        logging.error(f"Insufficient disk space: {free / (1 << 30):.2f} GB available, {min_space_gb} GB required")
         sys.exit(1)
 
 def parse_cookies(cookies_file):
     cookies = {}
     try:
-        with open(cookies_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    parts = line.strip().split('\t')
-                    if len(parts) >= 7:
-                        domain, _, _, _, _, name, value = parts[:7]
-                        if 'twitcasting.tv' in domain:
-                            cookies[name] = value
+        st = os.stat(cookies_file)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = COOKIE_CACHE.get(str(cookies_file))
+        if cached and cached[0] == stamp:
+            return cached[1]
+        text = Path(cookies_file).read_text(encoding='utf-8')
+        for domain, name, value in COOKIE_LINE_RE.findall(text):
+            if 'twitcasting.tv' in domain:
+                cookies[name] = value.strip()
         if 'tc_ss' in cookies and not INITIAL_AUTH_LOGGED["tc_ss"]:
             logging.info("Authentication successful: tc_ss cookie found")
             INITIAL_AUTH_LOGGED["tc_ss"] = True
         elif 'tc_ss' not in cookies and not INITIAL_AUTH_LOGGED["tc_ss"]:
             logging.warning("Cookies file does not contain tc_ss cookie")
             INITIAL_AUTH_LOGGED["tc_ss"] = True
+        COOKIE_CACHE[str(cookies_file)] = (stamp, cookies)
+        try:
+            SESSION.cookies.clear(domain=".twitcasting.tv")
+        except KeyError:
+            pass
+        for name, value in cookies.items():
+            SESSION.cookies.set(name, value, domain=".twitcasting.tv")
         return cookies
     except Exception as e:
         logging.error(f"Failed to parse cookies file: {e}")
         return {}
 
-def is_stream_live(streamer, cookies_file, retry_delay, quality="best", offline_counter=[0]):
-    logging.debug(f"Checking stream status for {streamer}")
-    time.sleep(random.uniform(0.5, 2.0))
+def is_stream_live(streamer, cookies_file, config, retry_delay, quality="best", offline_counter=[0]):
+    logging.debug("Checking stream status for %s", streamer)
     
     failure_reason = ""
-    cmd = [
-        "yt-dlp",
-        "--get-url",
-        "--hls-use-mpegts",
-        "--hls-prefer-ffmpeg",
-        "--cookies", str(cookies_file),
-        "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
-        "--add-header", "Referer:https://twitcasting.tv/",
-        "--add-header", "Origin:https://twitcasting.tv/",
-        f"https://twitcasting.tv/{streamer}"
-    ]
-    config = load_config(SCRIPT_DIR / "config.ini")
-    if config.get("private_stream_password"):
-        cmd.extend(["--video-password", config["private_stream_password"]])
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode == 0 and result.stdout.strip():
-            logging.info(f"Stream is live via yt-dlp: {streamer}")
-            if not INITIAL_AUTH_LOGGED["tc_ss"]:
-                logging.info("Authentication successful: Valid response from yt-dlp")
-                INITIAL_AUTH_LOGGED["tc_ss"] = True
-            offline_counter[0] = 0
-            return True, result.stdout.strip()
-        failure_reason = "yt-dlp"
-        logging.debug(f"yt-dlp stderr: {result.stderr}")
-    except subprocess.SubprocessError as e:
-        failure_reason = f"yt-dlp ({str(e)})"
-        logging.debug(f"yt-dlp stream check failed: {e}")
-    
     api_url = f"https://twitcasting.tv/streamserver.php?target={streamer}&mode=client&player=pc_web"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
-        "Referer": "https://twitcasting.tv/",
-        "Origin": "https://twitcasting.tv/"
-    }
-    cookies = parse_cookies(cookies_file)
+    parse_cookies(cookies_file)
     
     try:
-        response = requests.get(api_url, headers=headers, cookies=cookies, timeout=10)
+        response = SESSION.get(api_url, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        logging.debug(f"API response for {streamer}: {data}")
+        data = json.loads(response.content)
+        logging.debug("API response for %s: %s", streamer, data)
         if not INITIAL_AUTH_LOGGED["api"]:
             logging.info("Authentication successful: Valid response from API")
             INITIAL_AUTH_LOGGED["api"] = True
@@ -221,51 +277,145 @@ def is_stream_live(streamer, cookies_file, retry_delay, quality="best", offline_
             
             if not isinstance(hls_url, str) or not hls_url:
                 logging.warning(f"Invalid HLS URL for quality {quality}: {hls_url}")
-                return False, None
+                hls_url = None
+                failure_reason = f"API (no HLS URL for quality {quality})"
         
         if is_live and hls_url:
             logging.info(f"Stream is live via API, HLS URL: {hls_url}")
             offline_counter[0] = 0
             return True, hls_url
-        else:
-            failure_reason = f"{failure_reason + '/' if failure_reason else ''}API"
+        elif not is_live:
             offline_counter[0] += 1
-            logging.info(f"Stream offline ({failure_reason}): {streamer}, retrying in {retry_delay}s")
+            logging.info(f"Stream offline (API): {streamer}, retrying in {retry_delay}s")
             return False, None
-    except requests.RequestException as e:
-        failure_reason = f"{failure_reason + '/' if failure_reason else ''}API ({str(e)})"
-        logging.debug(f"API request failed: {e}")
-        offline_counter[0] += 1
-        logging.info(f"Stream offline ({failure_reason}): {streamer}, retrying in {retry_delay}s")
-        return False, None
+    except (requests.RequestException, ValueError) as e:
+        failure_reason = f"API ({str(e)})"
+        logging.debug("API request failed: %s", e)
+    
+    # The API could not answer, so fall back to letting yt-dlp resolve the stream
+    cmd = [
+        YTDLP_PATH,
+        "--get-url",
+        "--hls-use-mpegts",
+        "--hls-prefer-ffmpeg",
+        "--cookies", str(cookies_file),
+        *YTDLP_HEADER_ARGS,
+        f"https://twitcasting.tv/{streamer}"
+    ]
+    if config.get("private_stream_password"):
+        cmd.extend(["--video-password", config["private_stream_password"]])
+    cmd.append("--verbose" if logging.getLogger().isEnabledFor(logging.DEBUG) else "--no-warnings")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode == 0 and result.stdout.strip():
+            logging.info(f"Stream is live via yt-dlp: {streamer}")
+            if not INITIAL_AUTH_LOGGED["tc_ss"]:
+                logging.info("Authentication successful: Valid response from yt-dlp")
+                INITIAL_AUTH_LOGGED["tc_ss"] = True
+            offline_counter[0] = 0
+            return True, result.stdout.strip()
+        failure_reason = f"{failure_reason}/yt-dlp"
+        logging.debug("yt-dlp stderr: %s", result.stderr)
+    except subprocess.SubprocessError as e:
+        failure_reason = f"{failure_reason}/yt-dlp ({str(e)})"
+        logging.debug("yt-dlp stream check failed: %s", e)
+    
+    offline_counter[0] += 1
+    logging.info(f"Stream offline ({failure_reason}): {streamer}, retrying in {retry_delay}s")
+    return False, None
+
+def load_metadata_cache():
+    try:
+        with open(METADATA_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to load metadata cache: {e}")
+        return
+    if not isinstance(data, dict):
+        logging.warning("Ignoring malformed metadata cache")
+        return
+    for stream_id, entry in data.items():
+        if (isinstance(entry, dict) and isinstance(entry.get("title"), str)
+                and isinstance(entry.get("thumbnail"), str) and isinstance(entry.get("time"), (int, float))):
+            METADATA_CACHE[stream_id] = entry
+
+def cache_metadata(stream_id, title, thumbnail):
+    now = time.time()
+    with METADATA_LOCK:
+        for key in [k for k, v in METADATA_CACHE.items() if now - v["time"] >= METADATA_CACHE_TTL]:
+            del METADATA_CACHE[key]
+        METADATA_CACHE[stream_id] = {"title": title, "thumbnail": thumbnail, "time": now}
+        tmp_file = METADATA_CACHE_FILE.with_name(f"{METADATA_CACHE_FILE.name}.tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(METADATA_CACHE, f)
+            os.replace(tmp_file, METADATA_CACHE_FILE)
+        except OSError as e:
+            logging.warning(f"Failed to save metadata cache: {e}")
 
 def fetch_metadata(streamer, hls_url=None):
     url = f"https://twitcasting.tv/{streamer}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
-        "Referer": "https://twitcasting.tv/",
-        "Origin": "https://twitcasting.tv/"
-    }
     stream_id = "unknown"
     
     if hls_url:
-        stream_id_match = re.search(r'movie_id=(\d+)|/movie/(\d+)|movieid/(\d+)|/streams/(\d+)', hls_url)
+        stream_id_match = STREAM_ID_RE.search(hls_url)
         if stream_id_match:
             stream_id = next((g for g in stream_id_match.groups() if g), "unknown")
-            logging.debug(f"Extracted stream_id from HLS URL: {stream_id}")
+            logging.debug("Extracted stream_id from HLS URL: %s", stream_id)
+    
+    if stream_id != "unknown":
+        with METADATA_LOCK:
+            entry = METADATA_CACHE.get(stream_id)
+        if entry and time.time() - entry["time"] < METADATA_CACHE_TTL:
+            logging.debug("Using cached metadata for stream %s", stream_id)
+            return entry["title"], stream_id, entry["thumbnail"]
     
+    cached = PAGE_CACHE.get(streamer)
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
+    head_only = stream_id != "unknown"
     try:
-        response = requests.get(url, headers=headers, timeout=10, cookies=parse_cookies(SCRIPT_DIR / "cookies.txt"))
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        title = soup.find("meta", property="og:title")["content"] if soup.find("meta", property="og:title") else "Unknown Title"
-        thumbnail = soup.find("meta", property="og:image")["content"] if soup.find("meta", property="og:image") else ""
+        with SESSION.get(url, headers=headers, timeout=10, stream=True) as response:
+            if response.status_code == 304 and cached:
+                logging.debug("Channel page not modified, reusing cached copy for %s", streamer)
+                page = cached["page"]
+            elif head_only:
+                response.raise_for_status()
+                page = b""
+                for chunk in response.iter_content(8192):
+                    page += chunk
+                    if b"</head>" in page or len(page) >= HEAD_READ_LIMIT:
+                        break
+            else:
+                response.raise_for_status()
+                page = response.content
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if etag or last_modified:
+                    PAGE_CACHE[streamer] = {"etag": etag, "last_modified": last_modified, "page": page}
+        meta = {}
+        for match in OG_META_RE.finditer(page):
+            meta.setdefault(match.group(1).lower(), match.group(2))
+            if len(meta) == 2:
+                break
+        title = html.unescape(meta[b"title"].decode("utf-8", "replace")) if b"title" in meta else "Unknown Title"
+        thumbnail = html.unescape(meta[b"image"].decode("utf-8", "replace")) if b"image" in meta else ""
         
         if stream_id == "unknown":
-            stream_id_match = re.search(r"movie_id=(\d+)", response.text)
-            stream_id = stream_id_match.group(1) if stream_id_match else "unknown"
-            logging.debug(f"Extracted stream_id from webpage: {stream_id}")
+            stream_id_match = MOVIE_ID_RE.search(page)
+            stream_id = stream_id_match.group(1).decode("ascii") if stream_id_match else "unknown"
+            logging.debug("Extracted stream_id from webpage: %s", stream_id)
         
+        if stream_id != "unknown" and b"title" in meta:
+            cache_metadata(stream_id, title, thumbnail)
         return title, stream_id, thumbnail
     except Exception as e:
         logging.error(f"Failed to fetch metadata: {e}")
@@ -275,59 +425,106 @@ def download_thumbnail(thumbnail_url, save_path):
     if not thumbnail_url:
         return False
     try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"}
-        response = requests.get(thumbnail_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        with open(save_path, "wb") as f:
-            f.write(response.content)
+        with SESSION.get(thumbnail_url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(save_path, "wb") as f:
+                shutil.copyfileobj(response.raw, f, 64 * 1024)
         return True
     except Exception as e:
         logging.warning(f"Failed to download thumbnail: {e}")
+        Path(save_path).unlink(missing_ok=True)
         return False
 
-def generate_filename(title, streamer, stream_id, date):
-    unsafe_chars = r'[<>:"/\\|?*]'
-    title = re.sub(unsafe_chars, "_", title)
-    formatted_date = datetime.strptime(date, "%Y-%m-%d").strftime("[%Y%m%d]")
+def generate_filename(title, streamer, stream_id, dt):
+    title = sanitize_filename(title)
+    formatted_date = dt.strftime("[%Y%m%d]")
     filename = f"{formatted_date} {title} [{streamer}] [{stream_id}]"
     return filename[:255]
 
+def create_exclusive(path):
+    try:
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        return True
+    except FileExistsError:
+        return False
+
 def get_unique_filename(base_path, ext):
-    path = base_path.with_suffix(ext)
-    if not path.exists():
+    with os.scandir(base_path.parent) as entries:
+        existing = {entry.name for entry in entries}
+    path = base_path.with_name(f"{base_path.name}{ext}")
+    if path.name not in existing and create_exclusive(path):
         return path
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = f"{base_path.stem}_{timestamp}"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    base_name = f"{base_path.name}_{timestamp}"
     new_path = base_path.with_name(f"{base_name}{ext}")
     counter = 2
-    while new_path.exists():
+    while new_path.name in existing or not create_exclusive(new_path):
         new_path = base_path.with_name(f"{base_name}_{counter}{ext}")
         counter += 1
     return new_path
 
+def iter_ts_pcrs(data):
+    start = next((i for i in range(TS_PACKET_SIZE) if data[i:i + 1] == b"\x47" and data[i + TS_PACKET_SIZE:i + TS_PACKET_SIZE + 1] == b"\x47"), None)
+    if start is None:
+        return
+    for offset in range(start, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        if data[offset] != 0x47:
+            continue
+        # adaptation field present, long enough to hold a PCR, and PCR flag set
+        if data[offset + 3] & 0x20 and data[offset + 4] >= 7 and data[offset + 5] & 0x10:
+            pid = ((data[offset + 1] & 0x1F) << 8) | data[offset + 2]
+            b = data[offset + 6:offset + 11]
+            yield pid, (b[0] << 25) | (b[1] << 17) | (b[2] << 9) | (b[3] << 1) | (b[4] >> 7)
+
+def get_ts_duration(file_path):
+    with open(file_path, "rb") as f:
+        first = next(iter_ts_pcrs(f.read(TS_SCAN_BYTES)), None)
+        if first is None:
+            return 0
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - TS_SCAN_BYTES))
+        tail = f.read()
+    pcr_pid, first_pcr = first
+    last_pcr = None
+    for pid, pcr in iter_ts_pcrs(tail):
+        if pid == pcr_pid:
+            last_pcr = pcr
+    if last_pcr is None:
+        return 0
+    return ((last_pcr - first_pcr) % (1 << 33)) / 90000
+
 def get_stream_duration(file_path, retries=3, delay=1):
+    if Path(file_path).suffix == ".ts":
+        try:
+            duration = get_ts_duration(file_path)
+            if duration > 0:
+                return int(duration)
+        except OSError as e:
+            logging.debug("TS duration parsing error: %s", e)
     for attempt in range(retries):
         try:
-            cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)]
+            cmd = [FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)]
             result = subprocess.run(cmd, capture_output=True, text=True)
             duration = float(result.stdout.strip())
             return int(duration)
         except (subprocess.SubprocessError, ValueError) as e:
-            logging.debug(f"Duration parsing error on attempt {attempt + 1}: {e}")
+            logging.debug("Duration parsing error on attempt %s: %s", attempt + 1, e)
         time.sleep(delay)
     logging.warning(f"Failed to parse duration for {file_path} after {retries} attempts")
     return 0
 
-def validate_recording(file_path, min_duration=5, min_size_mb=0.1):
+def validate_recording(file_path, min_duration=5, min_size_mb=0.1, duration=0):
     try:
-        if not file_path.exists():
+        try:
+            size_mb = file_path.stat().st_size / (1024 * 1024)
+        except FileNotFoundError:
             return False, "File does not exist"
-        
-        size_mb = file_path.stat().st_size / (1024 * 1024)
         if size_mb < min_size_mb:
             return False, f"File size too small: {size_mb:.2f}MB"
         
-        duration = get_stream_duration(file_path)
+        if duration < min_duration:
+            duration = get_stream_duration(file_path)
         if duration < min_duration:
             return False, f"File duration too short: {duration}s"
         
@@ -335,198 +532,385 @@ def validate_recording(file_path, min_duration=5, min_size_mb=0.1):
     except Exception as e:
         return False, f"Validation error: {str(e)}"
 
-def record_stream(hls_url, output_file, cookies_file, quality, streamer=None, max_retries=3, retry_delay=10):
-    global PROCESS, STOP_EVENT
+def stop_process(process, force=False):
+    # yt-dlp runs in its own session/process group, so signal the whole group to reach its ffmpeg child too
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    elif force:
+        process.kill()
+    else:
+        process.send_signal(signal.CTRL_BREAK_EVENT)
+
+def stop_active_processes():
+    # recorders live in their own session, so they would outlive the script otherwise
+    with PROCESS_LOCK:
+        processes = list(ACTIVE_PROCESSES)
+    for process in processes:
+        if process.poll() is None:
+            stop_process(process)
+
+def parse_progress(line):
+    # ffmpeg status line: frame=... size=  12345kB time=00:01:02.34 bitrate=1623.4kbits/s ...
+    try:
+        size = line.split(b"size=", 1)[1].split(None, 1)[0]
+        timestamp = line.split(b"time=", 1)[1].split(None, 1)[0]
+        bitrate = line.split(b"bitrate=", 1)[1].split(None, 1)[0]
+        if size.endswith(b"KiB"):
+            size_kib = int(size[:-3])
+        elif size.endswith(b"kB"):
+            size_kib = int(size[:-2])
+        else:
+            return None
+        if timestamp.startswith(b"-") or not bitrate.endswith(b"kbits/s"):
+            return None
+        hours, minutes, seconds = timestamp.split(b":")
+        return size_kib, int(hours), int(minutes), int(seconds.split(b".", 1)[0]), float(bitrate[:-7])
+    except (IndexError, ValueError):
+        return None
+
+def drop_page_cache(file_path):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logging.debug("posix_fadvise failed for %s: %s", file_path, e)
+
+def drain_pipe(pipe, source, output):
+    # ffmpeg ends progress updates with \r, so split on either line ending
+    pending = b""
+    for chunk in iter(lambda: pipe.read1(65536), b""):
+        *lines, pending = LINE_SPLIT_RE.split(pending + chunk)
+        for line in lines:
+            output.put((source, line))
+    if pending:
+        output.put((source, pending))
+    pipe.close()
+
+def record_stream(hls_url, output_file, cookies_file, config, quality, streamer=None, max_retries=3, retry_delay=10):
     logging.info(f"Recording HLS URL: {hls_url}")
     logging.info(f"Writing File {output_file.name}")
     
-    config = load_config(SCRIPT_DIR / "config.ini")
-    cmd = [
-        "yt-dlp",
+    base_cmd = [
+        YTDLP_PATH,
         "--hls-use-mpegts",
         "--hls-prefer-ffmpeg",
         "--downloader", "ffmpeg",
+        "--ffmpeg-location", FFMPEG_PATH,
         "--no-part",
+        "--force-overwrites",
         "--xattrs",
         "--cookies", str(cookies_file),
-        "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
-        "--add-header", "Referer:https://twitcasting.tv/",
-        "--add-header", "Origin:https://twitcasting.tv/",
-        "-f", quality,
-        "--output", str(output_file),
-        hls_url
+        *YTDLP_HEADER_ARGS,
+        "-f", quality
     ]
     if config.get("private_stream_password"):
-        cmd.extend(["--video-password", config["private_stream_password"]])
+        base_cmd.extend(["--video-password", config["private_stream_password"]])
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    base_cmd.append("--verbose" if debug else "--no-warnings")
     
     retry_count = 0
     start_time = time.time()
-    last_progress = ""
-    progress_re = re.compile(r"frame=\s*\d+\s+fps=\s*[\d.]+.*size=\s*(\d+)kB\s+time=(\d{2}):(\d{2}):(\d{2})\.\d+\s+bitrate=\s*([\d.]+)kbits/s")
-    last_size_kib = 0
-    last_update_time = start_time
+    interactive = sys.stdout.isatty()
+    progress_label = f"[{streamer}] " if streamer else ""
     max_stall_time = 300
+    stall_check_interval = 10
+    progress_interval = 0.5 if interactive else 60
+    last_print = 0
+    disk_check_interval = 60
+    last_disk_check = start_time
+    low_disk = False
+    recorded_duration = 0
     
-    while not STOP_EVENT and retry_count < max_retries:
+    while not STOP_EVENT.is_set() and not low_disk and retry_count < max_retries:
+        # --force-overwrites may only ever replace the empty placeholder, never recorded data
+        try:
+            placeholder = output_file.stat().st_size == 0
+        except FileNotFoundError:
+            placeholder = False
+        if not placeholder:
+            try:
+                output_file = get_unique_filename(output_file.with_suffix(''), ".ts")
+            except OSError as e:
+                logging.error(f"Failed to create a new output file: {e}")
+                break
+            logging.info(f"New output file: {output_file}")
+        cmd = base_cmd + ["--output", str(output_file), hls_url]
+        recorded_duration = 0
+        last_size_kib = 0
+        last_update_time = time.time()
+        last_stall_check = 0
         try:
-            PROCESS = subprocess.Popen(
+            process = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.PIPE if debug else subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                bufsize=1,
-                universal_newlines=True
+                start_new_session=True,
+                creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
             )
         except subprocess.SubprocessError as e:
             logging.error(f"Failed to start recording process: {e}")
-            PROCESS = None
-            return
+            output_file.unlink(missing_ok=True)
+            return output_file, 0
+        with PROCESS_LOCK:
+            ACTIVE_PROCESSES.add(process)
         
-        while PROCESS.poll() is None:
+        output = queue.Queue()
+        readers = [threading.Thread(target=drain_pipe, args=(process.stderr, "stderr", output), daemon=True)]
+        if process.stdout:
+            readers.append(threading.Thread(target=drain_pipe, args=(process.stdout, "stdout", output), daemon=True))
+        for reader in readers:
+            reader.start()
+        stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        
+        while process.poll() is None:
             try:
-                line = PROCESS.stderr.readline().strip()
-                if line:
-                    match = progress_re.search(line)
-                    if match:
-                        size_kib, hours, minutes, seconds, bitrate = match.groups()
-                        try:
-                            size_kib = int(size_kib)
-                            hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+                try:
+                    source, line = output.get(timeout=1.0)
+                    line = line.strip()
+                except queue.Empty:
+                    source, line = None, b""
+                if source == "stdout":
+                    if line:
+                        logging.info(f"yt-dlp stdout: {line.decode('utf-8', 'replace')}")
+                elif line:
+                    stats = parse_progress(line) if b"frame=" in line else None
+                    if stats:
+                        size_kib, hours, minutes, seconds, bitrate = stats
+                        recorded_duration = hours * 3600 + minutes * 60 + seconds
+                        now_mono = time.monotonic()
+                        if now_mono - last_print >= progress_interval:
+                            last_print = now_mono
                             size_gb = size_kib / (1024 ** 2)
-                            duration = hours * 3600 + minutes * 60 + seconds
                             duration_str = f"{hours:02d}h {minutes:02d}m {seconds:02d}s"
-                            bitrate_float = float(bitrate)
-                            progress = f"size {size_gb:.2f}gb @ {duration_str} {bitrate_float:.0f}kb/s"
-                            print(f"\r{progress:<{len(last_progress)}}", end="", file=sys.stdout)
-                            sys.stdout.flush()
-                            last_progress = progress
-                            
-                            if output_file.exists():
-                                disk_size_kib = output_file.stat().st_size / 1024
-                                if disk_size_kib > last_size_kib:
-                                    last_size_kib = disk_size_kib
-                                    last_update_time = time.time()
-                                elif time.time() - last_update_time > max_stall_time:
-                                    logging.warning("Recording stalled, restarting...")
-                                    PROCESS.terminate()
-                                    try:
-                                        PROCESS.wait(timeout=10)
-                                    except subprocess.TimeoutExpired:
-                                        PROCESS.kill()
-                                    break
+                            progress = f"size {size_gb:.2f}gb @ {duration_str} {bitrate:.0f}kb/s"
+                            if interactive:
+                                with CONSOLE_LOCK:
+                                    sys.stdout.write(f"\r\033[K{progress_label}{progress}")
+                                    sys.stdout.flush()
                             else:
-                                logging.debug("Output file not yet created")
-                        except ValueError as e:
-                            logging.warning(f"Invalid progress data: {line}. Error: {e}")
-                            continue
+                                logging.info(f"Recording progress: {progress}")
+                    else:
+                        stderr_tail.append(line)
+                        if debug:
+                            logging.debug("yt-dlp output: %s", line.decode("utf-8", "replace"))
+                now = time.time()
+                if now - last_stall_check >= stall_check_interval:
+                    last_stall_check = now
+                    try:
+                        disk_size_kib = output_file.stat().st_size / 1024
+                    except FileNotFoundError:
+                        logging.debug("Output file not yet created")
                     else:
-                        logging.debug(f"yt-dlp output: {line}")
-                if STOP_EVENT:
+                        if disk_size_kib > last_size_kib:
+                            last_size_kib = disk_size_kib
+                            last_update_time = now
+                        elif now - last_update_time > max_stall_time:
+                            logging.warning("Recording stalled, restarting...")
+                            stop_process(process)
+                            try:
+                                process.wait(timeout=10)
+                            except subprocess.TimeoutExpired:
+                                stop_process(process, force=True)
+                            break
+                if now - last_disk_check >= disk_check_interval:
+                    last_disk_check = now
+                    free = get_free_space(output_file.parent)
+                    if free < MIN_FREE_SPACE_GB * (1 << 30):
+                        logging.error(f"Low disk space: {free / (1 << 30):.2f} GB available, stopping recording...")
+                        low_disk = True
+                        stop_process(process)
+                        break
+                if STOP_EVENT.is_set():
                     logging.info("Termination signal received, stopping recording...")
-                    PROCESS.terminate()
+                    stop_process(process)
                     break
-                time.sleep(0.1)
             except Exception as e:
                 logging.error(f"Error reading process output: {e}")
                 break
         
         end_time = time.time()
-        print(f"\r{' ' * len(last_progress)}", end="\r", file=sys.stdout)
-        sys.stdout.flush()
+        if interactive:
+            with CONSOLE_LOCK:
+                sys.stdout.write("\r\033[K")
+                sys.stdout.flush()
         
         try:
-            stdout, stderr = PROCESS.communicate(timeout=30)
-            for line in stdout.splitlines():
-                if line.strip():
-                    logging.info(f"yt-dlp stdout: {line.strip()}")
-            for line in stderr.splitlines():
-                if line.strip():
-                    logging.debug(f"yt-dlp stderr: {line.strip()}")
+            process.wait(timeout=30)
+            for reader in readers:
+                reader.join(timeout=5)
+            while not output.empty():
+                source, line = output.get_nowait()
+                if not line.strip():
+                    continue
+                if source == "stdout":
+                    logging.info(f"yt-dlp stdout: {line.strip().decode('utf-8', 'replace')}")
+                else:
+                    stderr_tail.append(line.strip())
+                    if debug:
+                        logging.debug("yt-dlp stderr: %s", line.strip().decode("utf-8", "replace"))
+            stderr = b"\n".join(stderr_tail).decode("utf-8", "replace")
             
-            if output_file.exists():
+            try:
                 size_bytes = output_file.stat().st_size
+            except FileNotFoundError:
+                size_bytes = None
+            if size_bytes:
                 logging.info(f"File exists after download: {output_file}, Size: {size_bytes / 1024:.2f} KiB")
             else:
+                # an empty file is only the name claimed by get_unique_filename
+                output_file.unlink(missing_ok=True)
+                size_bytes = None
                 logging.warning(f"File does not exist after download: {output_file}")
             
-            if PROCESS.returncode != 0:
-                logging.error(f"Recording failed with return code {PROCESS.returncode}: {stderr}")
+            if process.returncode != 0:
+                logging.error(f"Recording failed with return code {process.returncode}: {stderr}")
             
-            if output_file.exists():
-                is_valid, reason = validate_recording(output_file, min_duration=5, min_size_mb=0.1)
+            if size_bytes is not None:
+                is_valid, reason = validate_recording(output_file, min_duration=5, min_size_mb=0.1, duration=recorded_duration)
                 if is_valid:
-                    size_bytes = output_file.stat().st_size
                     size_gib = size_bytes / (1024 ** 3)
-                    duration = get_stream_duration(output_file)
+                    duration = recorded_duration or get_stream_duration(output_file)
                     if duration == 0:
                         duration = int(end_time - start_time)
-                        logging.debug(f"Using elapsed time as duration: {duration} seconds")
+                        logging.debug("Using elapsed time as duration: %s seconds", duration)
                     duration_str = f"{duration//3600:02d}h {(duration%3600)//60:02d}m {duration%60:02d}s"
                     speed_kib_s = (size_bytes / 1024) / duration if duration > 0 else 0
                     logging.info(f"Recording completed Size: {size_gib:.2f} GiB ({duration_str} @ {speed_kib_s:.2f} KiB/s)")
                     logging.info(f"File saved as: {output_file}")
+                    drop_page_cache(output_file)
                     break
                 else:
                     logging.warning(f"Invalid recording: {reason}")
                     output_file.unlink(missing_ok=True)
                     retry_count += 1
-                    if retry_count < max_retries and not STOP_EVENT:
+                    if retry_count < max_retries and not low_disk and not STOP_EVENT.is_set():
                         logging.info(f"Retrying recording ({retry_count}/{max_retries})...")
+                        if STOP_EVENT.wait(retry_delay):
+                            break
                         if streamer:
-                            is_live, new_hls_url = is_stream_live(streamer, cookies_file, retry_delay, quality)
+                            is_live, new_hls_url = is_stream_live(streamer, cookies_file, config, retry_delay, quality)
                             if not is_live:
                                 logging.info("Stream is no longer live, stopping retries.")
                                 break
                             hls_url = new_hls_url
-                        time.sleep(retry_delay)
-                        output_file = get_unique_filename(output_file.with_suffix(''), ".ts")
-                        logging.info(f"New output file: {output_file}")
                         continue
             else:
                 logging.warning(f"Recording file missing: {output_file}")
                 retry_count += 1
-                if retry_count < max_retries and not STOP_EVENT:
+                if retry_count < max_retries and not low_disk and not STOP_EVENT.is_set():
                     logging.info(f"Retrying recording ({retry_count}/{max_retries})...")
+                    if STOP_EVENT.wait(retry_delay):
+                        break
                     if streamer:
-                        is_live, new_hls_url = is_stream_live(streamer, cookies_file, retry_delay, quality)
+                        is_live, new_hls_url = is_stream_live(streamer, cookies_file, config, retry_delay, quality)
                         if not is_live:
                             logging.info("Stream is no longer live, stopping retries.")
                             break
                         hls_url = new_hls_url
-                    time.sleep(retry_delay)
-                    output_file = get_unique_filename(output_file.with_suffix(''), ".ts")
-                    logging.info(f"New output file: {output_file}")
                     continue
         except subprocess.TimeoutExpired:
             logging.warning("Recording process timed out during cleanup")
-            PROCESS.kill()
+            stop_process(process, force=True)
         except Exception as e:
             logging.error(f"Error during process cleanup: {e}")
         finally:
-            PROCESS = None
-        if STOP_EVENT:
+            with PROCESS_LOCK:
+                ACTIVE_PROCESSES.discard(process)
+        if STOP_EVENT.is_set():
             break
     
     if retry_count >= max_retries:
         logging.error(f"Max retries ({max_retries}) reached, giving up on recording.")
+    try:
+        if output_file.stat().st_size == 0:
+            output_file.unlink()
+    except OSError:
+        pass
+    return output_file, recorded_duration
 
 def signal_handler(sig, frame):
-    global STOP_EVENT, PROCESS
-    if STOP_EVENT:
+    if STOP_EVENT.is_set():
         return
-    STOP_EVENT = True
+    STOP_EVENT.set()
     logging.info("Termination signal received. Waiting for recording to complete...")
 
+def monitor_streamer(streamer, cookies_file, config, quality, check_interval, retry_delay):
+    # shows up as %(threadName)s, so --all logs say which streamer each line is about
+    threading.current_thread().name = streamer
+    save_folder = SCRIPT_DIR / sanitize_filename(streamer)
+    save_folder.mkdir(parents=True, exist_ok=True)
+    logging.info(f"Monitoring streamer: {streamer}")
+    
+    while not STOP_EVENT.is_set():
+        is_live, hls_url = is_stream_live(streamer, cookies_file, config, retry_delay, quality)
+        if is_live and not STOP_EVENT.is_set():
+            logging.info(f"Stream is live: {streamer}")
+            free = get_free_space(save_folder)
+            if free < MIN_FREE_SPACE_GB * (1 << 30):
+                logging.error(f"Insufficient disk space: {free / (1 << 30):.2f} GB available, skipping recording")
+                STOP_EVENT.wait(check_interval + random.uniform(0.5, 2.0))
+                continue
+            if RECORDING_SLOTS and not RECORDING_SLOTS.acquire(blocking=False):
+                logging.warning(f"All recording slots are busy, skipping {streamer} until next check")
+                STOP_EVENT.wait(check_interval + random.uniform(0.5, 2.0))
+                continue
+            try:
+                title, stream_id, thumbnail_url = fetch_metadata(streamer, hls_url)
+                filename = generate_filename(title, streamer, stream_id, datetime.now())
+            
+                ts_file = get_unique_filename(save_folder / filename, ".ts")
+                thumbnail_file = ts_file.with_suffix(".jpg") if thumbnail_url else None
+            
+                if thumbnail_url:
+                    THUMBNAIL_EXECUTOR.submit(download_thumbnail, thumbnail_url, thumbnail_file)
+            
+                ts_file, duration = record_stream(hls_url, ts_file, cookies_file, config, quality, streamer=streamer)
+            
+                try:
+                    size_bytes = ts_file.stat().st_size
+                except FileNotFoundError:
+                    logging.warning(f"Recording file missing: {ts_file}")
+                else:
+                    if not duration:
+                        duration = get_stream_duration(ts_file)
+                    logging.info(f"Recording saved: {ts_file} ({size_bytes / 1024:.2f} KB, {duration}s)")
+            finally:
+                if RECORDING_SLOTS:
+                    RECORDING_SLOTS.release()
+            
+            logging.info("Waiting before next stream check...")
+            STOP_EVENT.wait(check_interval + random.uniform(0.5, 2.0))
+        else:
+            STOP_EVENT.wait(check_interval + random.uniform(0.5, 2.0))
+    
+    logging.info(f"Stopped monitoring streamer: {streamer}")
+
 def main():
-    global args, STOP_EVENT, PROCESS
+    global args, RECORDING_SLOTS
     args = parse_args()
     config = load_config(SCRIPT_DIR / "config.ini")
     
     signal.signal(signal.SIGINT, signal_handler)
-    streamer = select_streamer(args, args.streamers_file) if not args.hls_url else None
-    setup_logging(args.debug, streamer)
+    for name in ("SIGTERM", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal_handler)
+    atexit.register(stop_active_processes)
+    if args.hls_url:
+        streamers = []
+    elif args.all:
+        streamers = load_streamers(args.streamers_file)
+    else:
+        streamers = [select_streamer(args, args.streamers_file)]
+    streamer = streamers[0] if len(streamers) == 1 else None
+    setup_logging(args.debug, "all" if args.all else streamer)
     check_dependencies()
     check_disk_space(SCRIPT_DIR)
     
@@ -536,70 +920,55 @@ def main():
         sys.exit(1)
     
     cookies = parse_cookies(cookies_file)
-    
-    sanitized_streamer = sanitize_filename(streamer) if streamer else None
-    save_folder = SCRIPT_DIR / sanitized_streamer if streamer else SCRIPT_DIR
-    save_folder.mkdir(parents=True, exist_ok=True)
+    load_metadata_cache()
     
     check_interval = float(config["check_interval"])
     retry_delay = float(config["retry_delay"])
+    max_parallel = args.max_parallel_recordings if args.max_parallel_recordings is not None else int(config["max_parallel_recordings"])
+    if max_parallel > 0:
+        RECORDING_SLOTS = threading.BoundedSemaphore(max_parallel)
     
     if args.hls_url:
         logging.info("Recording direct HLS URL")
-        date = datetime.now().strftime("%Y-%m-%d")
-        filename = f"{datetime.strptime(date, '%Y-%m-%d').strftime('[%Y%m%d]')}_Direct_Recording"
-        ts_file = get_unique_filename(save_folder / filename, ".ts")
+        filename = f"{datetime.now().strftime('[%Y%m%d]')}_Direct_Recording"
+        ts_file = get_unique_filename(SCRIPT_DIR / filename, ".ts")
         logging.info(f"Writing file {ts_file.name}")
-        record_stream(args.hls_url, ts_file, cookies_file, args.quality, streamer=streamer)
+        ts_file, _ = record_stream(args.hls_url, ts_file, cookies_file, config, args.quality)
         if ts_file.exists():
             logging.info(f"File saved as: {ts_file}")
-        if STOP_EVENT and not args.fast_exit:
+        if STOP_EVENT.is_set() and not args.fast_exit:
             logging.info("Waiting for recording cleanup before exit...")
             time.sleep(2)
         sys.exit(0)
     
-    logging.info(f"Monitoring streamer: {streamer}")
+    # Each monitor loops until STOP_EVENT, so every streamer needs its own worker
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(streamers)) as executor:
+        futures = {
+            executor.submit(monitor_streamer, s, cookies_file, config, args.quality, check_interval, retry_delay): s
+            for s in streamers
+        }
+        pending = set(futures)
+        failed = False
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=1.0)
+            for future in done:
+                if future.exception():
+                    failed = True
+                    logging.error(f"Monitoring {futures[future]} failed: {future.exception()}", exc_info=future.exception())
     
-    while not STOP_EVENT:
-        is_live, hls_url = is_stream_live(streamer, cookies_file, retry_delay, args.quality)
-        if is_live and not STOP_EVENT:
-            logging.info(f"Stream is live: {streamer}")
-            title, stream_id, thumbnail_url = fetch_metadata(streamer, hls_url)
-            date = datetime.now().strftime("%Y-%m-%d")
-            filename = generate_filename(title, streamer, stream_id, date)
-            
-            ts_file = get_unique_filename(save_folder / filename, ".ts")
-            thumbnail_file = ts_file.with_suffix(".jpg") if thumbnail_url else None
-            
-            if thumbnail_url:
-                download_thumbnail(thumbnail_url, thumbnail_file)
-            
-            record_stream(hls_url, ts_file, cookies_file, args.quality, streamer=streamer)
-            
-            if ts_file.exists():
-                size_bytes = ts_file.stat().st_size
-                duration = get_stream_duration(ts_file)
-                logging.info(f"Recording saved: {ts_file} ({size_bytes / 1024:.2f} KB, {duration}s)")
-            else:
-                logging.warning(f"Recording file missing: {ts_file}")
-            
-            logging.info("Waiting before next stream check...")
-            time.sleep(check_interval)
-        else:
-            time.sleep(check_interval)
-        
-        if STOP_EVENT:
-            logging.info("Exiting main loop after recording completion...")
-            if PROCESS and not args.fast_exit:
-                logging.info("Waiting for recording cleanup before exit...")
-                try:
-                    PROCESS.wait(timeout=30)
-                except subprocess.TimeoutExpired:
-                    logging.warning("Recording process did not terminate in time, forcing exit")
-                    PROCESS.kill()
-            break
+    logging.info("Exiting main loop after recording completion...")
+    with PROCESS_LOCK:
+        processes = list(ACTIVE_PROCESSES)
+    if processes and not args.fast_exit:
+        logging.info("Waiting for recording cleanup before exit...")
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                logging.warning("Recording process did not terminate in time, forcing exit")
+                stop_process(process, force=True)
     
-    sys.exit(0)
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     main()